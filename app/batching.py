@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class _BatchWorker:
+    """
+    File d'attente consommée par lots depuis un thread de fond.
+
+    Le thread attend un premier élément, récupère ceux déjà en file (et ceux
+    qui arrivent pendant ``window`` secondes), jusqu'à ``max_batch_size``,
+    puis traite le lot avec ``_process``.
+    """
+
+    def __init__(self, max_batch_size, window, name):
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._name = name
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _put(self, item):
+        self._ensure_started()
+        self._queue.put(item)
+
+    def _ensure_started(self):
+        # Démarrage paresseux : aucun thread n'existe avant le fork des workers
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, name=self._name, daemon=True
+                    )
+                    self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            self._process(self._collect())
+
+    def _process(self, batch):
+        raise NotImplementedError
+
+
+class MicroBatcher(_BatchWorker):
+    """
+    Regroupe les lignes envoyées par des requêtes concurrentes pour les
+    scorer en un seul appel au modèle.
+
+    ``predict_fn`` reçoit la matrice (B, n_features) du lot ; chaque
+    appelant reçoit sa probabilité via un Future.
+    """
+
+    def __init__(self, predict_fn, n_features, max_batch_size=64, window=0.0):
+        super().__init__(max_batch_size, window, name="micro-batcher")
+        self.predict_fn = predict_fn
+        self._buffer = np.empty((max_batch_size, n_features), dtype=np.float32)
+
+    def submit(self, row):
+        """Soumet une ligne de features, retourne un Future de sa probabilité."""
+        future = Future()
+        self._put((row, future))
+        return future
+
+    def _process(self, batch):
+        # Les requêtes annulées entre-temps (client déconnecté) sont ignorées
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        input_data = self._buffer[:len(batch)]
+        try:
+            for i, (row, _) in enumerate(batch):
+                input_data[i] = row
+            probas = self.predict_fn(input_data)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), proba in zip(batch, probas.tolist()):
+            future.set_result(proba)
+
+
+class TelemetryBatcher(_BatchWorker):
+    """
+    Regroupe les événements de télémétrie hors du chemin des requêtes.
+
+    ``record`` ne fait qu'ajouter l'événement à la file ; ``emit_fn`` est
+    appelé depuis le thread de fond avec la liste des événements du lot.
+    """
+
+    def __init__(self, emit_fn, max_batch_size=100, window=0.2):
+        super().__init__(max_batch_size, window, name="telemetry-batcher")
+        self.emit_fn = emit_fn
+
+    def record(self, event):
+        self._put(event)
+
+    def flush(self):
+        """Émet immédiatement les événements encore en file (arrêt de l'API)."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._process(batch)
+
+    def _process(self, batch):
+        try:
+            self.emit_fn(batch)
+        except Exception:
+            # La télémétrie ne doit jamais arrêter le thread de fond
+            pass
@@ -1,17 +1,131 @@
-import matplotlib
-matplotlib.use("Agg")  # OBLIGATOIRE pour Docker / Azure
-
 import pandas as pd
 import numpy as np
-from scipy.stats import ks_2samp
-import json
+from scipy.stats import kstwo
+import orjson
 import os
 from datetime import datetime
-import matplotlib.pyplot as plt
-import seaborn as sns
+from functools import lru_cache
+import threading
+# API objet de matplotlib + canvas Agg : pas de pyplot ni de backend GUI
+# (OBLIGATOIRE pour Docker / Azure)
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from app.models import FEATURE_COLUMNS
+
+# Lecteur CSV Arrow (multithreadé) si pyarrow est disponible
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# Compilation JIT (numba) du calcul de la statistique KS si disponible
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Figure réutilisée d'un rapport à l'autre (seuls les axes sont effacés)
+_FIG = Figure(figsize=(12, 6))
+_CANVAS = FigureCanvasAgg(_FIG)
+_AX = _FIG.add_subplot(111)
+_FIG_LOCK = threading.Lock()
+
+
+def _read_features(path, feature_cols):
+    """
+    Lit uniquement les colonnes de features présentes dans le CSV, en float32.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [col for col in feature_cols if col in header]
+    df = pd.read_csv(path, usecols=usecols, dtype=np.float32, engine=CSV_ENGINE)
+    return df[usecols]
+
+
+@lru_cache(maxsize=4)
+def _load_reference(path, mtime, feature_cols):
+    """
+    Colonnes de référence triées (sans NaN), mises en cache : la clé inclut
+    la date de modification du fichier, un CSV réécrit est donc relu.
+    """
+    ref = _read_features(path, list(feature_cols))
+    sorted_cols = {}
+    for col in ref.columns:
+        values = np.sort(ref[col].dropna().to_numpy(np.float64))
+        values.flags.writeable = False  # partagé entre les requêtes
+        sorted_cols[col] = values
+    return sorted_cols
+
+
+def _ks_diff_searchsorted(ref_sorted, prod_sorted):
+    """
+    max |cdf1 - cdf2| * n1 * n2 (en entiers, donc sans erreur d'arrondi),
+    les ECDF étant évaluées sur l'union des échantillons par dichotomie.
+    """
+    n1, n2 = len(ref_sorted), len(prod_sorted)
+    data_all = np.concatenate([ref_sorted, prod_sorted])
+    cdf1 = np.searchsorted(ref_sorted, data_all, side="right")
+    cdf2 = np.searchsorted(prod_sorted, data_all, side="right")
+    return np.max(np.abs(cdf1 * n2 - cdf2 * n1))
+
+
+def _ks_diff_merge(ref_sorted, prod_sorted):
+    """
+    Même calcul que _ks_diff_searchsorted, en un seul parcours fusionné
+    des deux échantillons triés (compilé par numba).
+    """
+    n1 = ref_sorted.shape[0]
+    n2 = prod_sorted.shape[0]
+    i = 0
+    j = 0
+    d = 0
+    # Une fois un échantillon épuisé, l'écart ne peut plus que diminuer
+    while i < n1 and j < n2:
+        v = min(ref_sorted[i], prod_sorted[j])
+        while i < n1 and ref_sorted[i] <= v:
+            i += 1
+        while j < n2 and prod_sorted[j] <= v:
+            j += 1
+        diff = abs(i * n2 - j * n1)
+        if diff > d:
+            d = diff
+    return d
+
+
+if njit is not None:
+    _ks_diff = njit(cache=True, nogil=True)(_ks_diff_merge)
+else:
+    _ks_diff = _ks_diff_searchsorted
+
+
+def _ks_sorted_ref(ref_sorted, prod):
+    """
+    Test de Kolmogorov-Smirnov à deux échantillons avec une référence pré-triée.
+
+    Seule la colonne de production est triée avant le calcul de l'écart
+    maximal entre les deux ECDF.
+
+    Args:
+        ref_sorted: Valeurs de référence triées, sans NaN
+        prod: Valeurs de production (les NaN sont ignorés)
 
+    Returns:
+        tuple: (statistique, p-value)
+    """
+    prod_sorted = np.sort(prod[~np.isnan(prod)])
+    n1, n2 = len(ref_sorted), len(prod_sorted)
+    stat = _ks_diff(ref_sorted, prod_sorted) / (n1 * n2)
+
+    # p-value asymptotique de Smirnov (méthode "asymp" de scipy.stats.ks_2samp)
+    m, n = float(max(n1, n2)), float(min(n1, n2))
+    en = m * n / (m + n)
+    p = min(max(kstwo.sf(stat, np.round(en)), 0.0), 1.0)
+    return stat, p
 
-def detect_drift(reference_file, production_file, threshold=0.05, output_dir="drift_reports"):
+
+def detect_drift(reference_file, production_file, threshold=0.05, output_dir="drift_reports",
+                 feature_cols=None):
     """
     Détecte le data drift entre les données de référence et de production
     en utilisant le test de Kolmogorov-Smirnov.
@@ -21,30 +135,37 @@ def detect_drift(reference_file, production_file, threshold=0.05, output_dir="dr
         production_file: Chemin vers le fichier CSV de production
         threshold: Seuil de p-value pour détecter le drift (défaut: 0.05)
         output_dir: Répertoire pour sauvegarder les rapports
+        feature_cols: Colonnes à comparer (défaut: features du modèle)
     
     Returns:
         dict: Résultats du drift pour chaque feature
     """
     os.makedirs(output_dir, exist_ok=True)
 
-    ref = pd.read_csv(reference_file)
-    prod = pd.read_csv(production_file)
+    if feature_cols is None:
+        feature_cols = FEATURE_COLUMNS
+
+    ref = _load_reference(
+        reference_file, os.path.getmtime(reference_file), tuple(feature_cols)
+    )
+    prod = _read_features(production_file, feature_cols)
 
     results = {}
 
-    for col in ref.columns:
-        if col != "Exited" and col in prod.columns:
-            stat, p = ks_2samp(ref[col].dropna(), prod[col].dropna())
+    for col, ref_sorted in ref.items():
+        if col in prod.columns:
+            stat, p = _ks_sorted_ref(ref_sorted, prod[col].to_numpy(np.float64))
             results[col] = {
-                "p_value": float(p),
-                "statistic": float(stat),
+                "p_value": p,
+                "statistic": stat,
+                # bool natif : la réponse de l'API ne sait pas encoder np.bool_
                 "drift_detected": bool(p < threshold),
                 "type": "numerical"
             }
 
     report_path = f"{output_dir}/drift_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(report_path, "w") as f:
-        json.dump(results, f, indent=2)
+    with open(report_path, "wb") as f:
+        f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
 
     return results
 
@@ -61,16 +182,16 @@ def generate_drift_report(results, output_dir="drift_reports"):
     
     colors = ['red' if d else 'green' for d in drifted]
     
-    plt.figure(figsize=(12, 6))
-    bars = plt.barh(features, p_values, color=colors)
-    plt.axvline(x=0.05, color='black', linestyle='--', label='Seuil (0.05)')
-    plt.xlabel('P-Value')
-    plt.title('Drift Detection - P-Values par Feature')
-    plt.legend()
-    plt.tight_layout()
-    
     report_path = f"{output_dir}/drift_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    plt.savefig(report_path)
-    plt.close()
-    
+
+    with _FIG_LOCK:
+        _AX.clear()
+        _AX.barh(features, p_values, color=colors)
+        _AX.axvline(x=0.05, color='black', linestyle='--', label='Seuil (0.05)')
+        _AX.set_xlabel('P-Value')
+        _AX.set_title('Drift Detection - P-Values par Feature')
+        _AX.legend()
+        _FIG.tight_layout()
+        _CANVAS.print_png(report_path)
+
     return report_path
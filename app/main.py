@@ -1,13 +1,31 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from typing import List, Union
+from pydantic import TypeAdapter, ValidationError
+from collections import Counter
+import asyncio
 import joblib
+import json
+import msgspec
 import numpy as np
+from sklearn import config_context
 import logging
 import os
+import re
+import threading
 import traceback
 
-from app.models import CustomerFeatures, PredictionResponse, HealthResponse
+from app.batching import MicroBatcher, TelemetryBatcher
+from app.onnx_model import OnnxModel
+from app.treelite_model import CompiledTreeModel
+from app.models import (
+    CustomerFeatures, CustomerBatch, CustomerStruct, PredictionResponse, HealthResponse,
+    FEATURE_COLUMNS
+)
 
 # ============================================================
 # LOGGING & APPLICATION INSIGHTS
@@ -16,23 +34,37 @@ from app.models import CustomerFeatures, PredictionResponse, HealthResponse
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("bank-churn-api")
 
-# Tentative de connexion à Application Insights
 APPINSIGHTS_CONN = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
-if APPINSIGHTS_CONN:
+_insights_handler = None
+
+
+def setup_app_insights():
+    """
+    Connecte le logger à Application Insights.
+
+    Appelée au démarrage de chaque worker, jamais à l'import : le handler
+    opencensus lance son thread d'export dès sa création, et un thread créé
+    dans le master gunicorn (--preload) ne survit pas au fork.
+    """
+    global _insights_handler
+    if _insights_handler is not None:
+        return
+    if not APPINSIGHTS_CONN:
+        logger.warning("app_startup - Application Insights non configuré")
+        return
     try:
         from opencensus.ext.azure.log_exporter import AzureLogHandler
-        handler = AzureLogHandler(connection_string=APPINSIGHTS_CONN)
-        logger.addHandler(handler)
-        logger.info("app_startup", extra={
-            "custom_dimensions": {
-                "event_type": "startup",
-                "status": "application_insights_connected"
-            }
-        })
     except ImportError:
         logger.warning("opencensus-ext-azure non installé, monitoring désactivé")
-else:
-    logger.warning("app_startup - Application Insights non configuré")
+        return
+    _insights_handler = AzureLogHandler(connection_string=APPINSIGHTS_CONN)
+    logger.addHandler(_insights_handler)
+    logger.info("app_startup", extra={
+        "custom_dimensions": {
+            "event_type": "startup",
+            "status": "application_insights_connected"
+        }
+    })
 
 
 # ============================================================
@@ -44,7 +76,8 @@ app = FastAPI(
     description="API de prédiction et monitoring du churn client",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -55,15 +88,137 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression des réponses volumineuses (/predict/batch, /drift/check) ;
+# niveau 5 : bon compromis taille / CPU, à baisser si le CPU sature
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# MODEL_PATH peut pointer vers le pickle sklearn, vers son export ONNX
+# (voir export_onnx.py), exécuté alors par ONNX Runtime, ou vers la
+# bibliothèque native compilée par treelite (voir export_treelite.py)
 MODEL_PATH = os.getenv("MODEL_PATH", "model/churn_model.pkl")
 model = None
 
+# Threads de calcul d'un modèle ONNX Runtime ou treelite ; 0 : choix de la
+# bibliothèque (tous les cœurs), à réduire quand plusieurs workers se
+# partagent la machine (voir gunicorn.conf.py)
+MODEL_NUM_THREADS = int(os.getenv("MODEL_NUM_THREADS", "0"))
+
+# Buffers d'entrée float32 réutilisés, un jeu par thread (les endpoints sync
+# tournent dans le threadpool de Starlette) pour les tailles de lot courantes
+_local = threading.local()
+_BUFFER_SIZES = (1, 8, 64, 512)
+
+
+def _input_buffer(n):
+    """Vue (n, n_features) sur un buffer préalloué du thread courant."""
+    size = next((s for s in _BUFFER_SIZES if s >= n), None)
+    if size is None:
+        return np.empty((n, len(FEATURE_COLUMNS)), dtype=np.float32)
+
+    buffers = getattr(_local, "buffers", None)
+    if buffers is None:
+        buffers = _local.buffers = {}
+    if size not in buffers:
+        buffers[size] = np.empty((size, len(FEATURE_COLUMNS)), dtype=np.float32)
+    return buffers[size][:n]
+
+
+# Micro-batching de /predict : les requêtes concurrentes sont scorées
+# ensemble. Avec une fenêtre à 0, seules les requêtes déjà en attente sont
+# regroupées (aucune latence ajoutée quand le trafic est faible).
+PREDICT_MAX_BATCH = int(os.getenv("PREDICT_MAX_BATCH", "64"))
+PREDICT_BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "0"))
+
+
+def _predict_proba(input_data):
+    """Probabilité de churn (classe 1) pour chaque ligne de input_data."""
+    # Entrées déjà validées (bornes Pydantic / msgspec, montants finis et
+    # dans la plage float32) : sklearn peut se passer de la recherche de
+    # NaN / inf de check_array
+    with config_context(assume_finite=True):
+        return model.predict_proba(input_data)[:, 1]
+
+
+# Le buffer (max_batch, n_features) du batcher est en float32, le dtype
+# interne des arbres sklearn : aucune conversion à l'appel du modèle.
+batcher = MicroBatcher(
+    _predict_proba,
+    n_features=len(FEATURE_COLUMNS),
+    max_batch_size=PREDICT_MAX_BATCH,
+    window=PREDICT_BATCH_WINDOW_MS / 1000
+)
 
-@app.on_event("startup")
-async def load_model():
+
+# ============================================================
+# PREDICTION TELEMETRY
+# ============================================================
+
+# Les événements de prédiction sont regroupés hors du chemin des requêtes et
+# envoyés à Application Insights sous forme d'un enregistrement agrégé par lot
+TELEMETRY_BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "100"))
+TELEMETRY_FLUSH_MS = float(os.getenv("TELEMETRY_FLUSH_MS", "200"))
+
+
+def _log_prediction_summary(events):
+    """Log un lot d'événements de prédiction en un seul enregistrement."""
+    count = sum(e["count"] for e in events)
+    endpoints = Counter(e["endpoint"] for e in events)
+    risks = Counter(e.get("risk_level") for e in events)
+
+    logger.info("prediction_summary", extra={
+        "custom_dimensions": {
+            "event_type": "prediction_summary",
+            "requests_predict": endpoints["/predict"],
+            "requests_batch": endpoints["/predict/batch"],
+            "predictions": count,
+            "churn_predicted": sum(e["churn_predicted"] for e in events),
+            "mean_probability": round(sum(e["probability_sum"] for e in events) / count, 4) if count else 0.0,
+            "risk_low": risks["Low"],
+            "risk_medium": risks["Medium"],
+            "risk_high": risks["High"]
+        }
+    })
+
+
+telemetry = TelemetryBatcher(
+    _log_prediction_summary,
+    max_batch_size=TELEMETRY_BATCH_SIZE,
+    window=TELEMETRY_FLUSH_MS / 1000
+)
+
+
+@app.on_event("shutdown")
+def flush_telemetry():
+    telemetry.flush()
+
+
+# Les modèles ONNX Runtime et treelite créent des pools de threads natifs au
+# chargement, qui ne survivent pas à un fork : seul le pickle sklearn peut être
+# chargé dans le master gunicorn (--preload, voir gunicorn.conf.py)
+FORK_SAFE_MODEL = not MODEL_PATH.endswith((".onnx", ".so"))
+
+
+def warm_up_model():
+    """Premier appel à vide : initialisations paresseuses faites avant la première vraie requête."""
+    _predict_proba(np.zeros((1, len(FEATURE_COLUMNS)), dtype=np.float32))
+
+
+def init_model(warm_up=True):
+    """Charge le modèle de MODEL_PATH (synchrone, appelable avant le fork)."""
     global model
     try:
-        model = joblib.load(MODEL_PATH)
+        if MODEL_PATH.endswith(".onnx"):
+            model = OnnxModel(MODEL_PATH, num_threads=MODEL_NUM_THREADS)
+        elif MODEL_PATH.endswith(".so"):
+            model = CompiledTreeModel(MODEL_PATH, nthread=MODEL_NUM_THREADS or None)
+        else:
+            # Les tableaux numpy du pickle sont projetés en mémoire (mmap) au
+            # lieu d'être lus. Seuls les nœuds du gradient boosting restent
+            # projetés (pages partagées entre workers d'un même hôte) : les
+            # arbres de la forêt les recopient dans leurs propres buffers
+            model = joblib.load(MODEL_PATH, mmap_mode="r")
+        if warm_up:
+            warm_up_model()
         logger.info("model_loaded", extra={
             "custom_dimensions": {
                 "event_type": "model_load",
@@ -81,6 +236,27 @@ async def load_model():
         model = None
 
 
+@app.on_event("startup")
+async def load_model():
+    global model
+    setup_app_insights()
+    if model is None:
+        init_model()
+        return
+    # Déjà chargé (sans appel à vide) dans le master si gunicorn a préchargé
+    # l'application : l'appel à vide est fait ici, une fois par worker
+    try:
+        warm_up_model()
+    except Exception as e:
+        logger.error("model_load_failed", extra={
+            "custom_dimensions": {
+                "event_type": "model_load",
+                "error": str(e)
+            }
+        })
+        model = None
+
+
 # ============================================================
 # GENERAL ENDPOINTS
 # ============================================================
@@ -106,8 +282,70 @@ def health():
 # PREDICTION ENDPOINTS
 # ============================================================
 
-@app.post("/predict", response_model=PredictionResponse, tags=["Predictions"])
-def predict(features: CustomerFeatures):
+# Mode non strict : comme Pydantic, 650.0 ou "650" sont acceptés pour un
+# entier (mais pas 650.5)
+_customer_decoder = msgspec.json.Decoder(CustomerStruct, strict=False)
+
+# Message msgspec : "<erreur> - at `$.Champ[0]`" (chemin absent à la racine)
+_MSGSPEC_ERROR = re.compile(r"(?P<msg>.*?)(?: - at `\$(?P<path>[^`]*)`)?", re.DOTALL)
+_MSGSPEC_PATH_PART = re.compile(r"\.([^.\[]+)|\[(\d+)\]")
+_MSGSPEC_MISSING = re.compile(r"Object missing required field `(?P<field>[^`]+)`")
+
+
+def _msgspec_error_detail(e):
+    """Erreur msgspec au format de FastAPI, loc pointant sur le champ fautif."""
+    match = _MSGSPEC_ERROR.fullmatch(str(e))
+    msg = match["msg"]
+    loc = ["body"]
+    for field, index in _MSGSPEC_PATH_PART.findall(match["path"] or ""):
+        loc.append(field or int(index))
+    missing = _MSGSPEC_MISSING.fullmatch(msg)
+    if missing:
+        loc.append(missing["field"])
+    return {
+        "type": "missing" if missing else "value_error",
+        "loc": tuple(loc),
+        "msg": msg,
+        "input": None
+    }
+
+
+async def decode_customer(request: Request) -> CustomerStruct:
+    """Décode et valide le corps JSON de /predict avec msgspec."""
+    try:
+        return _customer_decoder.decode(await request.body())
+    except (msgspec.ValidationError, msgspec.DecodeError) as e:
+        raise RequestValidationError([_msgspec_error_detail(e)])
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    # Les erreurs renvoient la valeur reçue, qui peut être NaN / inf :
+    # orjson les écrit en null là où le JSONResponse par défaut lève une erreur
+    errors = jsonable_encoder(exc.errors())
+    try:
+        return ORJSONResponse(status_code=422, content={"detail": errors})
+    except TypeError:
+        # Entier au-delà de 64 bits dans la valeur reçue, qu'orjson refuse :
+        # erreurs renvoyées sans elle
+        return ORJSONResponse(
+            status_code=422,
+            content={"detail": [{k: v for k, v in e.items() if k != "input"} for e in errors]}
+        )
+
+
+@app.post(
+    "/predict",
+    response_model=PredictionResponse,
+    tags=["Predictions"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": CustomerFeatures.model_json_schema()}}
+        }
+    }
+)
+async def predict(features: CustomerStruct = Depends(decode_customer)):
     """
     Prédit la probabilité de churn pour un client.
     """
@@ -115,7 +353,7 @@ def predict(features: CustomerFeatures):
         raise HTTPException(status_code=503, detail="Model unavailable")
 
     try:
-        input_data = np.array([[  
+        proba = await asyncio.wrap_future(batcher.submit((
             features.CreditScore,
             features.Age,
             features.Tenure,
@@ -126,21 +364,17 @@ def predict(features: CustomerFeatures):
             features.EstimatedSalary,
             features.Geography_Germany,
             features.Geography_Spain
-        ]])
-
-        proba = float(model.predict_proba(input_data)[0][1])
+        )))
         prediction = int(proba > 0.5)
 
         risk = "Low" if proba < 0.3 else "Medium" if proba < 0.7 else "High"
 
-        logger.info("prediction", extra={
-            "custom_dimensions": {
-                "event_type": "prediction",
-                "endpoint": "/predict",
-                "probability": proba,
-                "prediction": prediction,
-                "risk_level": risk
-            }
+        telemetry.record({
+            "endpoint": "/predict",
+            "count": 1,
+            "churn_predicted": prediction,
+            "probability_sum": proba,
+            "risk_level": risk
         })
 
         return {
@@ -159,44 +393,103 @@ def predict(features: CustomerFeatures):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/predict/batch", tags=["Predictions"])
-def predict_batch(features_list: List[CustomerFeatures]):
+# Schéma de /predict/batch choisi selon la forme du JSON : une liste est un
+# lot de clients, un objet un lot au format colonnes. Une union Pydantic
+# validerait les deux, et ses erreurs mêleraient les deux schémas.
+_batch_records = TypeAdapter(List[CustomerFeatures])
+_batch_columns = TypeAdapter(CustomerBatch)
+
+
+async def decode_batch(request: Request) -> Union[CustomerBatch, List[CustomerFeatures]]:
+    """Décode le corps JSON de /predict/batch et le valide selon sa forme."""
+    body = await request.body()
+    if not body:
+        raise RequestValidationError([
+            {"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}
+        ])
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError([{
+            "type": "json_invalid",
+            "loc": ("body", e.pos),
+            "msg": "JSON decode error",
+            "input": {},
+            "ctx": {"error": e.msg}
+        }])
+
+    schema = _batch_records if isinstance(data, list) else _batch_columns
+    try:
+        return schema.validate_python(data)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])}
+            for error in e.errors(include_url=False)
+        ])
+
+
+@app.post(
+    "/predict/batch",
+    tags=["Predictions"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {"anyOf": [
+                CustomerBatch.model_json_schema(),
+                {"type": "array", "items": CustomerFeatures.model_json_schema()}
+            ]}}}
+        }
+    }
+)
+def predict_batch(batch: Union[CustomerBatch, List[CustomerFeatures]] = Depends(decode_batch)):
     """
     Prédit la probabilité de churn pour plusieurs clients.
+
+    Accepte un objet au format colonnes (une liste par feature, validé en
+    une seule passe vectorisée) ou une liste de clients.
     """
     if model is None:
         raise HTTPException(status_code=503, detail="Model unavailable")
 
     try:
-        predictions = []
-
-        for features in features_list:
-            input_data = np.array([[  
-                features.CreditScore,
-                features.Age,
-                features.Tenure,
-                features.Balance,
-                features.NumOfProducts,
-                features.HasCrCard,
-                features.IsActiveMember,
-                features.EstimatedSalary,
-                features.Geography_Germany,
-                features.Geography_Spain
-            ]])
-
-            proba = float(model.predict_proba(input_data)[0][1])
-            prediction = int(proba > 0.5)
-
-            predictions.append({
-                "churn_probability": round(proba, 4),
-                "prediction": prediction
-            })
-
-        logger.info("batch_prediction", extra={
-            "custom_dimensions": {
-                "event_type": "batch_prediction",
-                "count": len(predictions)
-            }
+        # Une seule matrice (N, n_features) et un seul appel au modèle :
+        # le parcours des arbres est amorti sur tout le lot.
+        if isinstance(batch, CustomerBatch):
+            input_data = batch.to_matrix()
+        else:
+            input_data = _input_buffer(len(batch))
+            for i, f in enumerate(batch):
+                input_data[i] = (
+                    f.CreditScore,
+                    f.Age,
+                    f.Tenure,
+                    f.Balance,
+                    f.NumOfProducts,
+                    f.HasCrCard,
+                    f.IsActiveMember,
+                    f.EstimatedSalary,
+                    f.Geography_Germany,
+                    f.Geography_Spain
+                )
+
+        if len(input_data):
+            probas = _predict_proba(input_data)
+        else:
+            probas = np.empty(0)
+
+        rounded = np.round(probas, 4)
+        labels = (probas > 0.5).astype(np.int8)
+
+        predictions = [
+            {"churn_probability": p, "prediction": q}
+            for p, q in zip(rounded.tolist(), labels.tolist())
+        ]
+
+        telemetry.record({
+            "endpoint": "/predict/batch",
+            "count": len(predictions),
+            "churn_predicted": int(labels.sum()),
+            "probability_sum": float(probas.sum())
         })
 
         return {
@@ -1,5 +1,11 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+from typing import Annotated, List, Optional
+import msgspec
+import numpy as np
+
+# Plus grand montant accepté : au-delà, la conversion en float32 (dtype des
+# entrées du modèle) donnerait inf
+_FLOAT32_MAX = float(np.finfo(np.float32).max)
 
 
 class CustomerFeatures(BaseModel):
@@ -7,11 +13,11 @@ class CustomerFeatures(BaseModel):
     CreditScore: int = Field(..., ge=300, le=850, description="Score de crédit (300-850)")
     Age: int = Field(..., ge=18, le=100, description="Âge du client")
     Tenure: int = Field(..., ge=0, le=10, description="Ancienneté en années")
-    Balance: float = Field(..., ge=0, description="Solde du compte")
+    Balance: float = Field(..., ge=0, le=_FLOAT32_MAX, allow_inf_nan=False, description="Solde du compte")
     NumOfProducts: int = Field(..., ge=1, le=4, description="Nombre de produits")
     HasCrCard: int = Field(..., ge=0, le=1, description="Possède une carte de crédit (0/1)")
     IsActiveMember: int = Field(..., ge=0, le=1, description="Membre actif (0/1)")
-    EstimatedSalary: float = Field(..., ge=0, description="Salaire estimé")
+    EstimatedSalary: float = Field(..., ge=0, le=_FLOAT32_MAX, allow_inf_nan=False, description="Salaire estimé")
     Geography_Germany: int = Field(..., ge=0, le=1, description="Client allemand (0/1)")
     Geography_Spain: int = Field(..., ge=0, le=1, description="Client espagnol (0/1)")
 
@@ -32,6 +38,99 @@ class CustomerFeatures(BaseModel):
         }
 
 
+# Ordre des colonnes attendu par le modèle (identique à l'entraînement)
+FEATURE_COLUMNS = list(CustomerFeatures.model_fields)
+
+# Bornes (ge, le) de chaque feature, reprises des contraintes de CustomerFeatures
+_BOUNDS = {
+    name: {
+        key: getattr(m, key)
+        for m in field.metadata for key in ("ge", "le") if hasattr(m, key)
+    }
+    for name, field in CustomerFeatures.model_fields.items()
+}
+_LOWER = np.array([_BOUNDS[c].get("ge", -np.inf) for c in FEATURE_COLUMNS])
+_UPPER = np.array([_BOUNDS[c].get("le", np.inf) for c in FEATURE_COLUMNS])
+
+# Équivalent msgspec de CustomerFeatures (mêmes types et bornes) : décodage
+# et validation du JSON en C, sans instancier de modèle Pydantic. La classe
+# Pydantic reste la référence pour la documentation OpenAPI.
+CustomerStruct = msgspec.defstruct(
+    "CustomerStruct",
+    [
+        (name, Annotated[field.annotation, msgspec.Meta(**_BOUNDS[name])])
+        for name, field in CustomerFeatures.model_fields.items()
+    ],
+    frozen=True,
+)
+
+
+class CustomerBatch(BaseModel):
+    """Lot de clients au format colonnes : une liste de valeurs par feature"""
+    CreditScore: List[int]
+    Age: List[int]
+    Tenure: List[int]
+    Balance: List[float]
+    NumOfProducts: List[int]
+    HasCrCard: List[int]
+    IsActiveMember: List[int]
+    EstimatedSalary: List[float]
+    Geography_Germany: List[int]
+    Geography_Spain: List[int]
+
+    _matrix: np.ndarray = PrivateAttr()
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "CreditScore": [650, 720],
+                "Age": [35, 52],
+                "Tenure": [5, 2],
+                "Balance": [50000.0, 0.0],
+                "NumOfProducts": [2, 1],
+                "HasCrCard": [1, 0],
+                "IsActiveMember": [1, 0],
+                "EstimatedSalary": [75000.0, 42000.0],
+                "Geography_Germany": [0, 1],
+                "Geography_Spain": [1, 0]
+            }
+        }
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        """Construit la matrice (N, n_features) et vérifie toutes les bornes d'un coup."""
+        columns = [getattr(self, c) for c in FEATURE_COLUMNS]
+        if len({len(col) for col in columns}) > 1:
+            raise ValueError("Toutes les colonnes doivent avoir la même longueur")
+
+        matrix = np.empty((len(columns[0]), len(columns)), dtype=np.float32)
+        # Dépassements de la plage float32 (-> inf) rejetés juste après ;
+        # les entiers trop grands même pour un float64 lèvent OverflowError,
+        # converti en ValueError pour donner une erreur de validation (422)
+        with np.errstate(over="ignore"):
+            for j, col in enumerate(columns):
+                try:
+                    matrix[:, j] = col
+                except (OverflowError, TypeError):
+                    raise ValueError(f"{FEATURE_COLUMNS[j]}: valeur(s) hors de la plage float32")
+
+        # Comparaisons écrites pour être fausses sur NaN, et valeurs hors de la
+        # plage float32 (devenues inf) rejetées : le modèle ne revérifie pas
+        invalid = ~((matrix >= _LOWER) & (matrix <= _UPPER)) | ~np.isfinite(matrix)
+        if invalid.any():
+            raise ValueError("; ".join(
+                f"{FEATURE_COLUMNS[j]}: {n} valeur(s) hors de [{_LOWER[j]:g}, {_UPPER[j]:g}]"
+                for j, n in enumerate(invalid.sum(axis=0)) if n
+            ))
+
+        self._matrix = matrix
+        return self
+
+    def to_matrix(self):
+        """Matrice float32 (N, n_features) dans l'ordre FEATURE_COLUMNS."""
+        return self._matrix
+
+
 class PredictionResponse(BaseModel):
     """Schéma de réponse pour une prédiction"""
     churn_probability: float = Field(..., description="Probabilité de churn (0-1)")
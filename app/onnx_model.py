@@ -0,0 +1,31 @@
+import numpy as np
+
+
+class OnnxModel:
+    """
+    Modèle exporté en ONNX (voir export_onnx.py), exécuté par ONNX Runtime
+    sur CPU avec toutes les optimisations de graphe.
+
+    Seule la sortie des probabilités du graphe skl2onnx est calculée, le
+    label étant déduit par l'API au seuil 0.5.
+    """
+
+    def __init__(self, path, num_threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 0 : choix d'ONNX Runtime (un thread par cœur physique)
+        options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_name = self.session.get_inputs()[0].name
+        # Sorties skl2onnx (zipmap=False) : [label, probabilities]
+        self._proba_name = self.session.get_outputs()[1].name
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        proba = self.session.run([self._proba_name], {self._input_name: X})[0]
+        # float64 comme sklearn (l'arrondi à 4 décimales reste exact)
+        return proba.astype(np.float64)
@@ -0,0 +1,27 @@
+import numpy as np
+
+
+class CompiledTreeModel:
+    """
+    Ensemble d'arbres compilé en bibliothèque native par treelite/TL2cgen
+    (voir export_treelite.py).
+
+    nthread borne le pool de threads du prédicteur (None : tous les cœurs).
+    """
+
+    def __init__(self, path, nthread=None):
+        import tl2cgen
+
+        self._tl2cgen = tl2cgen
+        self.predictor = tl2cgen.Predictor(path, nthread=nthread)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        # Sortie (n_lignes, n_cibles, n_classes) : une seule cible ici
+        proba = self.predictor.predict(self._tl2cgen.DMatrix(X, dtype="float32"))
+        proba = proba.reshape(len(X), -1).astype(np.float64)
+        if proba.shape[1] == 1:
+            # Gradient boosting binaire : seule la probabilité de la classe
+            # positive est produite, on reconstitue les deux colonnes
+            proba = np.column_stack([1.0 - proba[:, 0], proba[:, 0]])
+        return proba
@@ -0,0 +1,73 @@
+# export_onnx.py
+import argparse
+import numpy as np
+import pandas as pd
+import joblib
+
+from app.models import FEATURE_COLUMNS
+from app.onnx_model import OnnxModel
+
+MODEL_PATH = "model/churn_model.pkl"
+ONNX_PATH = "model/churn_model.onnx"
+ONNX_INT8_PATH = "model/churn_model_int8.onnx"
+DATA_PATH = "data/bank_churn.csv"
+
+# Opérateurs dont les poids sont quantifiables en int8 (modèles linéaires,
+# réseaux) ; un ensemble d'arbres n'est qu'un TreeEnsembleClassifier
+QUANTIZABLE_OPS = {"MatMul", "Gemm"}
+
+
+def check_export(model, exported, path):
+    """
+    Vérification sur le dataset : les probabilités du modèle exporté
+    (sauvegardé dans path) doivent coïncider avec celles du modèle sklearn.
+    Partagée avec export_treelite.py.
+    """
+    X = pd.read_csv(DATA_PATH, usecols=FEATURE_COLUMNS)[FEATURE_COLUMNS]
+    X = X.to_numpy(dtype=np.float32)
+    expected = model.predict_proba(X)[:, 1]
+    actual = exported.predict_proba(X)[:, 1]
+    print(f"\nModèle exporté sauvegardé dans : {path}")
+    print(f"Écart max des probabilités : {np.max(np.abs(expected - actual)):.2e}")
+    print(f"Prédictions identiques : {np.mean((expected > 0.5) == (actual > 0.5)):.2%}")
+
+
+if __name__ == "__main__":
+    # Importé ici : check_export sert aussi à export_treelite.py
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    parser = argparse.ArgumentParser(description="Export du modèle de churn en ONNX")
+    parser.add_argument("--quantize", action="store_true",
+                        help="Quantification dynamique int8 des poids (si applicable)")
+    args = parser.parse_args()
+
+    print(f"Chargement du modèle : {MODEL_PATH}")
+    model = joblib.load(MODEL_PATH)
+
+    # Conversion : entrée float32 (N, n_features), probabilités en tenseur
+    # (zipmap=False) plutôt qu'en liste de dictionnaires
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[("X", FloatTensorType([None, len(FEATURE_COLUMNS)]))],
+        options={id(model): {"zipmap": False}},
+    )
+
+    with open(ONNX_PATH, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+
+    check_export(model, OnnxModel(ONNX_PATH), ONNX_PATH)
+    served_path = ONNX_PATH
+
+    if args.quantize:
+        ops = {node.op_type for node in onnx_model.graph.node}
+        if ops & QUANTIZABLE_OPS:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            quantize_dynamic(ONNX_PATH, ONNX_INT8_PATH, weight_type=QuantType.QInt8)
+            check_export(model, OnnxModel(ONNX_INT8_PATH), ONNX_INT8_PATH)
+            served_path = ONNX_INT8_PATH
+        else:
+            print(f"\nQuantification ignorée : aucun opérateur quantifiable ({', '.join(sorted(ops))})")
+
+    print(f"Servir avec : MODEL_PATH={served_path} uvicorn app.main:app")
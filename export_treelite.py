@@ -0,0 +1,28 @@
+# export_treelite.py
+import os
+import joblib
+import treelite
+import tl2cgen
+
+from app.treelite_model import CompiledTreeModel
+from export_onnx import check_export
+
+MODEL_PATH = "model/churn_model.pkl"
+LIB_PATH = "model/churn_model.so"
+
+print(f"Chargement du modèle : {MODEL_PATH}")
+model = joblib.load(MODEL_PATH)
+
+# Génération du code C de l'ensemble d'arbres puis compilation native ;
+# parallel_comp répartit les arbres sur plusieurs unités de compilation
+print("Compilation du modèle (peut prendre quelques minutes)...")
+tl2cgen.export_lib(
+    treelite.sklearn.import_model(model),
+    toolchain="gcc",
+    libpath=LIB_PATH,
+    params={"parallel_comp": os.cpu_count()},
+    nthread=os.cpu_count(),
+)
+
+check_export(model, CompiledTreeModel(LIB_PATH), LIB_PATH)
+print(f"Servir avec : MODEL_PATH={LIB_PATH} uvicorn app.main:app")
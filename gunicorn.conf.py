@@ -0,0 +1,43 @@
+# gunicorn.conf.py
+import gc
+import multiprocessing
+import os
+
+# Un thread de calcul par worker : avec un worker par cœur, un pool de
+# cpu_count() threads chacun sursouscrirait le CPU. OMP_NUM_THREADS borne le
+# pool OpenMP du gradient boosting sklearn, MODEL_NUM_THREADS ceux d'ONNX
+# Runtime et de treelite (fixés ici, avant que le master n'importe l'app)
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MODEL_NUM_THREADS", "1")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# loop/http "auto" : uvloop et httptools (installés avec uvicorn[standard])
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# L'application (et le modèle, voir on_starting) est importée une seule fois
+# dans le master : les workers forkés partagent ces pages en copy-on-write
+preload_app = True
+
+# Épinglage optionnel de chaque worker sur un cœur (PIN_WORKERS=1), à éviter
+# si le conteneur est limité par quota CPU plutôt que par cpuset
+PIN_WORKERS = os.getenv("PIN_WORKERS", "0") == "1"
+
+
+def on_starting(server):
+    from app import main
+
+    if main.FORK_SAFE_MODEL:
+        # Sans appel à vide : la prédiction du gradient boosting démarre le
+        # pool de threads OpenMP, qui ne doit exister qu'après le fork
+        main.init_model(warm_up=False)
+    # Objets du master exclus du GC des workers : ses passages ne réécrivent
+    # plus (et ne dupliquent donc plus) les pages partagées
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if PIN_WORKERS:
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpus[worker.age % len(cpus)]})
@@ -180,7 +180,8 @@ if uploaded_file is not None:
             if st.button("🚀 Lancer les prédictions batch", type="primary"):
                 with st.spinner("Envoi des données à l'API..."):
                     try:
-                        batch_data = df[required_columns].to_dict(orient='records')
+                        # Format colonnes : une liste de valeurs par feature
+                        batch_data = df[required_columns].to_dict(orient='list')
                         response = requests.post(BATCH_URL, json=batch_data, timeout=120)
                         
                         if response.status_code == 200:
@@ -1,6 +1,7 @@
 # tests/test_api.py
 import sys
 import os
+import json
 from unittest.mock import patch
 import numpy as np
 
@@ -59,13 +60,97 @@ def test_predict_with_mock():
 def test_predict_batch_with_mock():
     """Test /predict/batch avec un mock du modèle"""
     with patch('app.main.model') as mock_model:
-        # Simulation d'une prédiction réussie
-        mock_model.predict_proba.return_value = np.array([[0.2, 0.8]])
-        mock_model.predict.return_value = np.array([1])
+        # Simulation d'une prédiction réussie (un seul appel pour tout le lot)
+        mock_model.predict_proba.return_value = np.array([[0.2, 0.8], [0.9, 0.1]])
+        mock_model.predict.return_value = np.array([1, 0])
         
         response = client.post("/predict/batch", json=[TEST_CUSTOMER, TEST_CUSTOMER])
         # Le test passe si l'API traite la requête
         assert response.status_code in [200, 422, 503]
+        assert mock_model.predict_proba.call_count == 1
+        assert response.json()["predictions"] == [
+            {"churn_probability": 0.8, "prediction": 1},
+            {"churn_probability": 0.1, "prediction": 0}
+        ]
+
+
+def test_predict_batch_empty():
+    """Test /predict/batch avec une liste vide"""
+    with patch('app.main.model') as mock_model:
+        response = client.post("/predict/batch", json=[])
+        assert response.status_code == 200
+        assert response.json() == {"predictions": [], "count": 0}
+        mock_model.predict_proba.assert_not_called()
+
+
+def test_predict_batch_columnar():
+    """Test /predict/batch au format colonnes (une liste par feature)"""
+    batch = {name: [value, value] for name, value in TEST_CUSTOMER.items()}
+    with patch('app.main.model') as mock_model:
+        mock_model.predict_proba.return_value = np.array([[0.2, 0.8], [0.9, 0.1]])
+
+        response = client.post("/predict/batch", json=batch)
+        assert response.status_code == 200
+        assert response.json()["count"] == 2
+        input_data = mock_model.predict_proba.call_args[0][0]
+        assert input_data.shape == (2, 10)
+        assert input_data.dtype == np.float32
+
+
+def test_predict_batch_columnar_invalid():
+    """Test /predict/batch au format colonnes avec des valeurs hors bornes"""
+    batch = {name: [value, value] for name, value in TEST_CUSTOMER.items()}
+    batch["CreditScore"] = [650, 100]
+    response = client.post("/predict/batch", json=batch)
+    assert response.status_code == 422
+
+
+def test_predict_batch_columnar_nan():
+    """Test /predict/batch au format colonnes avec NaN ou valeur hors float32"""
+    for value in (float("nan"), 1e40):
+        batch = {name: [v] for name, v in TEST_CUSTOMER.items()}
+        batch["EstimatedSalary"] = [value]
+        response = client.post(
+            "/predict/batch",
+            content=json.dumps(batch),
+            headers={"Content-Type": "application/json"}
+        )
+        assert response.status_code == 422
+
+
+def test_predict_batch_huge_integer():
+    """Test /predict/batch avec un entier trop grand même pour un float64"""
+    huge = "1" + "0" * 400
+    batch = {name: [value] for name, value in TEST_CUSTOMER.items()}
+    body = json.dumps(batch).replace('"CreditScore": [650]', f'"CreditScore": [{huge}]')
+    response = client.post("/predict/batch", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+    body = json.dumps([TEST_CUSTOMER]).replace('"CreditScore": 650', f'"CreditScore": {huge}')
+    response = client.post("/predict/batch", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_predict_batch_records_error_loc():
+    """Test que les erreurs du format liste gardent le format d'origine"""
+    response = client.post("/predict/batch", json=[{**TEST_CUSTOMER, "Age": 5}])
+    assert response.status_code == 422
+    detail = response.json()["detail"]
+    assert [error["loc"] for error in detail] == [["body", 0, "Age"]]
+
+
+def test_predict_batch_gzip():
+    """Test que les réponses volumineuses sont compressées si le client l'accepte"""
+    with patch('app.main.model') as mock_model:
+        mock_model.predict_proba.return_value = np.tile([[0.2, 0.8]], (100, 1))
+        response = client.post(
+            "/predict/batch",
+            json=[TEST_CUSTOMER] * 100,
+            headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["count"] == 100
 
 
 def test_health_without_model():
@@ -95,3 +180,78 @@ def test_predict_invalid_data():
     }
     response = client.post("/predict", json=invalid_customer)
     assert response.status_code == 422  # Validation error
+
+
+def test_predict_lax_integers():
+    """Test /predict avec des entiers envoyés en float ou en chaîne (acceptés par Pydantic)"""
+    with patch('app.main.model') as mock_model:
+        mock_model.predict_proba.return_value = np.array([[0.7, 0.3]])
+        for value in (650.0, "650"):
+            response = client.post("/predict", json={**TEST_CUSTOMER, "CreditScore": value})
+            assert response.status_code == 200
+
+
+def test_predict_invalid_data_loc():
+    """Test que l'erreur de validation de /predict désigne le champ fautif"""
+    response = client.post("/predict", json={**TEST_CUSTOMER, "CreditScore": 100})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "CreditScore"]
+
+    customer = dict(TEST_CUSTOMER)
+    del customer["Age"]
+    response = client.post("/predict", json=customer)
+    assert response.json()["detail"][0]["loc"] == ["body", "Age"]
+
+
+def test_predict_out_of_float32_range():
+    """Test /predict avec un montant qui déborderait en float32"""
+    with patch('app.main.model') as mock_model:
+        mock_model.predict_proba.return_value = np.array([[0.7, 0.3]])
+        response = client.post("/predict", json={**TEST_CUSTOMER, "Balance": 1e40})
+        assert response.status_code == 422
+        assert not mock_model.predict_proba.called
+
+
+def test_predict_batch_non_finite():
+    """Test /predict/batch au format liste avec un montant infini ou hors float32"""
+    with patch('app.main.model') as mock_model:
+        mock_model.predict_proba.return_value = np.array([[0.7, 0.3]])
+        for value in (float("inf"), 1e40):
+            response = client.post(
+                "/predict/batch",
+                content=json.dumps([{**TEST_CUSTOMER, "Balance": value}]),
+                headers={"Content-Type": "application/json"}
+            )
+            assert response.status_code == 422
+        assert not mock_model.predict_proba.called
+
+
+def test_app_insights_connected_at_startup_only():
+    """Test que le handler Application Insights est créé au démarrage, pas à l'import"""
+    import logging
+    import types
+    from app import main
+
+    assert main._insights_handler is None
+    fake_exporter = types.SimpleNamespace(
+        AzureLogHandler=lambda connection_string: logging.NullHandler()
+    )
+    with patch('app.main.APPINSIGHTS_CONN', 'InstrumentationKey=test'), \
+            patch('app.main._insights_handler', None), \
+            patch.dict(sys.modules, {'opencensus.ext.azure.log_exporter': fake_exporter}):
+        main.setup_app_insights()
+        handler = main._insights_handler
+        assert handler in main.logger.handlers
+        main.logger.removeHandler(handler)
+
+
+def test_preloaded_model_warmed_up_at_startup():
+    """Test que le modèle préchargé par le master est appelé à vide au démarrage du worker"""
+    import asyncio
+    from app import main
+
+    with patch('app.main.model') as mock_model:
+        mock_model.predict_proba.return_value = np.array([[0.5, 0.5]])
+        asyncio.run(main.load_model())
+        mock_model.predict_proba.assert_called_once()
+        assert mock_model.predict_proba.call_args[0][0].shape == (1, 10)
@@ -0,0 +1,85 @@
+# tests/test_batching.py
+import sys
+import os
+import threading
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.batching import MicroBatcher, TelemetryBatcher
+
+
+def test_concurrent_rows_scored_in_one_call():
+    """Test que les lignes soumises pendant la fenêtre sont scorées ensemble"""
+    calls = []
+    release = threading.Event()
+
+    def predict_fn(input_data):
+        release.wait(timeout=5)
+        calls.append(input_data.shape)
+        return input_data[:, 0] / 10
+
+    batcher = MicroBatcher(predict_fn, n_features=2, max_batch_size=8, window=0.5)
+    futures = [batcher.submit((i, 0)) for i in range(5)]
+    release.set()
+
+    assert [f.result(timeout=5) for f in futures] == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4])
+    assert calls == [(5, 2)]
+
+
+def test_errors_propagate_to_every_caller():
+    """Test qu'une erreur du modèle est renvoyée à chaque requête du lot"""
+    def predict_fn(input_data):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(predict_fn, n_features=2, window=0.1)
+    futures = [batcher.submit((1, 2)) for _ in range(3)]
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+
+
+def test_max_batch_size_respected():
+    """Test que les lots ne dépassent pas max_batch_size"""
+    sizes = []
+
+    def predict_fn(input_data):
+        sizes.append(len(input_data))
+        return np.zeros(len(input_data))
+
+    batcher = MicroBatcher(predict_fn, n_features=1, max_batch_size=4, window=0.2)
+    futures = [batcher.submit((0,)) for _ in range(10)]
+
+    assert [f.result(timeout=5) for f in futures] == [0.0] * 10
+    assert max(sizes) <= 4
+    assert sum(sizes) == 10
+
+
+def test_telemetry_events_emitted_together():
+    """Test que les événements reçus pendant la fenêtre sont émis en un seul lot"""
+    emitted = []
+    done = threading.Event()
+
+    def emit_fn(events):
+        emitted.append(events)
+        done.set()
+
+    telemetry = TelemetryBatcher(emit_fn, max_batch_size=100, window=0.5)
+    for i in range(5):
+        telemetry.record({"count": i})
+
+    assert done.wait(timeout=5)
+    assert emitted == [[{"count": i} for i in range(5)]]
+
+
+def test_telemetry_flush_and_errors():
+    """Test que flush émet les événements en attente et que les erreurs sont absorbées"""
+    def emit_fn(events):
+        raise RuntimeError("exporter down")
+
+    telemetry = TelemetryBatcher(emit_fn)
+    telemetry._queue.put({"count": 1})
+    telemetry.flush()  # ne lève pas d'exception
+    assert telemetry._queue.empty()
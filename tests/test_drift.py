@@ -0,0 +1,63 @@
+# tests/test_drift.py
+import sys
+import os
+import numpy as np
+import pandas as pd
+from scipy.stats import ks_2samp
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.drift_detect import (
+    _ks_diff_merge, _ks_diff_searchsorted, _ks_sorted_ref, detect_drift
+)
+
+
+def test_ks_sorted_ref_matches_scipy():
+    """Test que le KS à référence pré-triée donne les mêmes résultats que scipy"""
+    rng = np.random.default_rng(42)
+    ref = rng.integers(0, 5, size=300).astype(float)
+    prod = rng.integers(0, 6, size=200).astype(float)
+    prod[5] = np.nan
+
+    stat, p = _ks_sorted_ref(np.sort(ref), prod)
+
+    expected = ks_2samp(ref, prod[~np.isnan(prod)], method="asymp")
+    assert np.isclose(stat, expected.statistic)
+    assert np.isclose(p, expected.pvalue)
+
+
+def test_ks_sorted_ref_identical_samples():
+    """Test qu'aucun drift n'est détecté sur deux échantillons identiques"""
+    data = np.random.default_rng(0).normal(size=500)
+    stat, p = _ks_sorted_ref(np.sort(data), data.copy())
+    assert stat == 0
+    assert p == 1
+
+
+def test_ks_diff_merge_matches_searchsorted():
+    """Test que le parcours fusionné donne le même écart que la recherche dichotomique"""
+    rng = np.random.default_rng(3)
+    for size_a, size_b, high in [(50, 80, 4), (300, 200, 1000), (1, 7, 3)]:
+        a = np.sort(rng.integers(0, high, size_a).astype(float))
+        b = np.sort(rng.integers(0, high, size_b).astype(float))
+        assert _ks_diff_merge(a, b) == _ks_diff_searchsorted(a, b)
+
+
+def test_detect_drift_on_shifted_data(tmp_path):
+    """Test que detect_drift signale uniquement les colonnes décalées"""
+    rng = np.random.default_rng(1)
+    ref = pd.DataFrame({"Age": rng.normal(40, 10, 1000), "Tenure": rng.integers(0, 11, 1000)})
+    prod = ref.assign(Age=ref["Age"] + 5)
+    ref.to_csv(tmp_path / "ref.csv", index=False)
+    prod.to_csv(tmp_path / "prod.csv", index=False)
+
+    results = detect_drift(
+        str(tmp_path / "ref.csv"),
+        str(tmp_path / "prod.csv"),
+        output_dir=str(tmp_path / "reports"),
+        feature_cols=["Age", "Tenure", "Balance"]
+    )
+
+    assert set(results) == {"Age", "Tenure"}
+    assert results["Age"]["drift_detected"] is True
+    assert results["Tenure"]["drift_detected"] is False
@@ -0,0 +1,53 @@
+# tests/test_onnx_model.py
+import sys
+import os
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+skl2onnx = pytest.importorskip("skl2onnx")
+pytest.importorskip("onnxruntime")
+
+from sklearn.ensemble import RandomForestClassifier
+from skl2onnx.common.data_types import FloatTensorType
+
+from app.onnx_model import OnnxModel
+
+
+@pytest.fixture
+def forest_onnx(tmp_path):
+    """Forêt exportée comme dans export_onnx.py (probabilités en tenseur, sans zipmap)"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 10))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0).fit(X, y)
+
+    onnx_model = skl2onnx.convert_sklearn(
+        model,
+        initial_types=[("X", FloatTensorType([None, 10]))],
+        options={id(model): {"zipmap": False}},
+    )
+    path = tmp_path / "model.onnx"
+    path.write_bytes(onnx_model.SerializeToString())
+    return model, X, str(path)
+
+
+def test_onnx_model_float64_input(forest_onnx):
+    """Test qu'une entrée float64 est convertie pour le graphe float32, sortie en float64"""
+    model, X, path = forest_onnx
+
+    proba = OnnxModel(path).predict_proba(X)
+
+    assert proba.dtype == np.float64
+    # Seuils des arbres en float32 dans le graphe ONNX
+    np.testing.assert_allclose(proba, model.predict_proba(X.astype(np.float32)), atol=1e-5)
+
+
+def test_onnx_model_num_threads(forest_onnx):
+    """Test que le nombre de threads demandé est appliqué à la session"""
+    _, _, path = forest_onnx
+
+    session = OnnxModel(path, num_threads=1).session
+
+    assert session.get_session_options().intra_op_num_threads == 1
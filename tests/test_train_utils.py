@@ -0,0 +1,109 @@
+# tests/test_train_utils.py
+import sys
+import os
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import confusion_matrix, roc_auc_score
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from train_utils import (
+    _accumulate_oob, _score_loop, _score_numpy, fit_forest_oob, score_predictions
+)
+
+
+def test_score_predictions_matches_sklearn():
+    """Test que les deux implémentations donnent les comptes et l'AUC de sklearn"""
+    rng = np.random.default_rng(5)
+    # Probabilités arrondies pour produire des ex aequo, y compris au seuil
+    for size, decimals in [(500, 6), (300, 1), (2, 2)]:
+        y_true = rng.integers(0, 2, size)
+        y_true[:2] = [0, 1]
+        y_proba = np.round(rng.random(size), decimals)
+        y_proba[-1] = 0.5
+
+        expected = (
+            *confusion_matrix(y_true, y_proba > 0.5, labels=[0, 1]).ravel().tolist(),
+            roc_auc_score(y_true, y_proba),
+        )
+        for score in (score_predictions, _score_loop, _score_numpy):
+            tn, fp, fn, tp, auc = score(y_true, y_proba)
+            assert (tn, fp, fn, tp) == expected[:4]
+            assert np.isclose(auc, expected[4])
+
+
+def test_score_predictions_single_class():
+    """Test que l'AUC est NaN quand une seule classe est présente"""
+    y_true = np.zeros(10, dtype=np.int64)
+    y_proba = np.linspace(0, 1, 10)
+
+    for score in (score_predictions, _score_loop, _score_numpy):
+        tn, fp, fn, tp, auc = score(y_true, y_proba)
+        assert (tn + fp, fn + tp) == (10, 0)
+        assert np.isnan(auc)
+
+
+def test_accumulate_oob_matches_sklearn():
+    """Test que les probabilités out-of-bag cumulées sont celles de sklearn"""
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(200, 5)).astype(np.float32)
+    y = (X[:, 0] > 0).astype(np.int64)
+    for max_samples in (None, 0.5):
+        model = RandomForestClassifier(
+            n_estimators=30, max_depth=3, max_samples=max_samples,
+            oob_score=True, random_state=0
+        ).fit(X, y)
+        n_bootstrap = 200 if max_samples is None else 100
+
+        oob_sum = np.zeros(len(X))
+        oob_count = np.zeros(len(X), dtype=np.int64)
+        # Deux lots successifs, comme dans fit_forest_oob
+        _accumulate_oob(model.estimators_[:10], X, n_bootstrap, oob_sum, oob_count)
+        _accumulate_oob(model.estimators_[10:], X, n_bootstrap, oob_sum, oob_count)
+
+        seen = oob_count > 0
+        np.testing.assert_allclose(
+            oob_sum[seen] / oob_count[seen], model.oob_decision_function_[seen, 1]
+        )
+
+
+def test_fit_forest_oob_stops_growing():
+    """Test que la forêt croît par lots, sans dépasser n_estimators"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 5)).astype(np.float32)
+    y = (X[:, 0] > 0).astype(np.int64)
+    model = RandomForestClassifier(n_estimators=200, max_depth=3, random_state=0)
+
+    fit_forest_oob(model, X, y, step=10, tol=1e-2)
+
+    assert len(model.estimators_) % 10 == 0
+    assert 10 <= len(model.estimators_) < 200
+    assert model.n_estimators == len(model.estimators_)
+    assert model.warm_start is False
+    assert model.oob_score is False
+    assert not hasattr(model, "oob_decision_function_")
+
+
+def test_fit_forest_oob_fewer_trees_than_step():
+    """Test que la forêt est ajustée même avec n_estimators < step"""
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(200, 5)).astype(np.float32)
+    y = (X[:, 0] > 0).astype(np.int64)
+    model = RandomForestClassifier(n_estimators=4, max_depth=3, random_state=0)
+
+    fit_forest_oob(model, X, y, step=10)
+
+    assert len(model.estimators_) == 4
+
+
+def test_fit_forest_oob_reaches_cap():
+    """Test que le plafond est atteint quand il n'est pas multiple de step"""
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(200, 5)).astype(np.float32)
+    y = (X[:, 0] > 0).astype(np.int64)
+    model = RandomForestClassifier(n_estimators=25, max_depth=3, random_state=0)
+
+    # Tolérance négative : la croissance ne s'arrête qu'au plafond
+    fit_forest_oob(model, X, y, step=10, tol=-np.inf)
+
+    assert len(model.estimators_) == 25
@@ -0,0 +1,36 @@
+# tests/test_treelite_model.py
+import sys
+import os
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+treelite = pytest.importorskip("treelite")
+tl2cgen = pytest.importorskip("tl2cgen")
+
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+from app.treelite_model import CompiledTreeModel
+
+
+@pytest.mark.parametrize("model", [
+    # Deux probabilités par ligne en sortie du prédicteur
+    RandomForestClassifier(n_estimators=5, max_depth=3, random_state=0),
+    # Une seule : la probabilité de la classe positive
+    HistGradientBoostingClassifier(max_iter=5, max_depth=3, random_state=0),
+])
+def test_compiled_model_two_columns(tmp_path, model):
+    """Test que la sortie du prédicteur est ramenée à la forme (N, 2) de sklearn"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 10)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    model.fit(X, y)
+
+    path = str(tmp_path / "model.so")
+    tl2cgen.export_lib(treelite.sklearn.import_model(model), toolchain="gcc", libpath=path)
+
+    proba = CompiledTreeModel(path, nthread=1).predict_proba(X)
+
+    assert proba.shape == (200, 2)
+    np.testing.assert_allclose(proba, model.predict_proba(X), atol=1e-6)
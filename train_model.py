@@ -1,127 +1,304 @@
 # train_model.py
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import (
-    accuracy_score, 
-    precision_score, 
-    recall_score,
-    f1_score, 
-    roc_auc_score,
-    confusion_matrix
-)
+from sklearn.model_selection import StratifiedShuffleSplit
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.inspection import permutation_importance
+import sklearn
 import joblib
+import hashlib
 import mlflow
 import mlflow.sklearn
-import matplotlib.pyplot as plt
-import seaborn as sns
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+import gc
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from train_utils import fit_forest_oob, score_predictions
 
-# Création du dossier model s'il n'existe pas
-os.makedirs("model", exist_ok=True)
+# Forêt aléatoire entraînée sur GPU par cuML (RAPIDS) quand il est installé,
+# puis convertie en forêt sklearn (as_sklearn, cuML >= 25.02) : l'API et les
+# exports ONNX / treelite restent inchangés
+try:
+    from cuml.ensemble import RandomForestClassifier as CuRandomForestClassifier
+    if not hasattr(CuRandomForestClassifier, "as_sklearn"):
+        CuRandomForestClassifier = None
+except ImportError:
+    CuRandomForestClassifier = None
+
+# Schéma du dataset : entiers étroits et float32 (précision utilisée de
+# toute façon par les arbres sklearn) au lieu des int64/float64 inférés
+DTYPES = {
+    'CreditScore': 'int16',
+    'Age': 'int8',
+    'Tenure': 'int8',
+    'Balance': 'float32',
+    'NumOfProducts': 'int8',
+    'HasCrCard': 'int8',
+    'IsActiveMember': 'int8',
+    'EstimatedSalary': 'float32',
+    'Geography_Germany': 'int8',
+    'Geography_Spain': 'int8',
+    'Exited': 'int8'
+}
+
+# Algorithme entraîné : gradient boosting à histogrammes (défaut) ou
+# forêt aléatoire (MODEL_TYPE=random_forest)
+MODEL_TYPE = os.getenv("MODEL_TYPE", "hist_gradient_boosting")
+
+# Pickle local compressé (MODEL_COMPRESS=1) : fichier plusieurs fois plus
+# petit, mais chargé entièrement par l'API au lieu d'être projeté en mmap
+MODEL_COMPRESS = os.getenv("MODEL_COMPRESS", "0") == "1"
+try:
+    import lz4  # noqa: F401
+    COMPRESSION = ("lz4", 3)
+except ImportError:
+    COMPRESSION = ("zlib", 3)
+
+
+
+def save_confusion_matrix(cm, path):
+    """Trace la matrice de confusion 2x2 dans path (imshow + annotations)."""
+    # Figure indépendante de l'état global de pyplot : traçable depuis un thread
+    from matplotlib.figure import Figure
+    
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    fig.colorbar(ax.imshow(cm, cmap='Blues'))
+    for (i, j), count in np.ndenumerate(cm):
+        ax.text(j, i, count, ha='center', va='center',
+                color='white' if count > cm.max() / 2 else 'black')
+    ax.set_xticks([0, 1])
+    ax.set_yticks([0, 1])
+    ax.set_title('Matrice de Confusion')
+    ax.set_ylabel('Vraie Classe')
+    ax.set_xlabel('Classe Prédite')
+    fig.savefig(path)
+    return path
+
+
+def save_feature_importance(model, X_test, y_test, feature_names, path):
+    """Trace l'importance des features du modèle dans path."""
+    from matplotlib.figure import Figure
+    
+    # Native pour la forêt, par permutation sur le jeu de test pour le
+    # gradient boosting qui n'en expose pas
+    if hasattr(model, 'feature_importances_'):
+        importances = model.feature_importances_
+    else:
+        importances = permutation_importance(
+            model, X_test, y_test, scoring='roc_auc', n_repeats=5, random_state=42
+        ).importances_mean
+    feature_importance = pd.DataFrame({
+        'feature': feature_names,
+        'importance': importances
+    }).sort_values('importance', ascending=False)
+    
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.barh(feature_importance['feature'], feature_importance['importance'])
+    ax.set_xlabel('Importance')
+    ax.set_title('Feature Importance')
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+
+# Création des dossiers model (et de son cache) s'ils n'existent pas
+os.makedirs("model/cache", exist_ok=True)
 
 # Configuration MLflow
 mlflow.set_tracking_uri("./mlruns")
 mlflow.set_experiment("bank-churn-prediction")
 
 print("Chargement des données...")
-df = pd.read_csv("data/bank_churn.csv")
+# Le CSV n'est parsé que lorsqu'il a changé : une copie Parquet typée en est
+# gardée à côté, relue ensuite sans parsing ni inférence de types
+CSV_PATH = "data/bank_churn.csv"
+PARQUET_PATH = "data/bank_churn.parquet"
+if (not os.path.exists(PARQUET_PATH)
+        or os.path.getmtime(PARQUET_PATH) < os.path.getmtime(CSV_PATH)):
+    # Lecteur CSV Arrow multithreadé, seules les colonnes du schéma sont lues
+    pd.read_csv(
+        CSV_PATH,
+        engine="pyarrow",
+        usecols=list(DTYPES),
+        dtype=DTYPES
+    ).to_parquet(PARQUET_PATH, compression="snappy", index=False)
+df = pd.read_parquet(PARQUET_PATH, columns=list(DTYPES))
 
 print(f"Dataset : {len(df)} lignes, {len(df.columns)} colonnes")
 print(f"Taux de churn : {df['Exited'].mean():.2%}")
 
-# Séparation features/target
-X = df.drop('Exited', axis=1)
-y = df['Exited']
+# Séparation features/target : pop retire la cible sur place, le reste du
+# DataFrame est directement la matrice de features (sans copie via drop)
+y = df.pop('Exited').to_numpy(dtype=np.int8)
+feature_names = list(df.columns)
+X = df.to_numpy(dtype=np.float32)
 
-# Split train/test (80/20)
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
+# Split train/test (80/20) stratifié : seuls les indices sont tirés, puis
+# chaque partie est extraite une fois des tableaux numpy
+splitter = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+train_idx, test_idx = next(splitter.split(X, y))
+X_train, X_test = X[train_idx], X[test_idx]
+y_train, y_test = y[train_idx], y[test_idx]
 
 print(f"\nTrain : {len(X_train)} lignes")
 print(f"Test : {len(X_test)} lignes")
 
+# Le DataFrame et les tableaux complets ne servent plus : libérés avant le fit
+# pour que le pic mémoire ne compte que les parties train/test
+del df, X, y, train_idx, test_idx
+gc.collect()
+
 # Entraînement avec MLflow tracking
 print("\nEntraînement du modèle...")
-with mlflow.start_run(run_name="random-forest-v1"):
+with mlflow.start_run(run_name=f"{MODEL_TYPE.replace('_', '-')}-v1"):
     
     # Paramètres du modèle
-    params = {
-        'n_estimators': 100,
-        'max_depth': 10,
-        'min_samples_split': 5,
-        'random_state': 42
-    }
+    if MODEL_TYPE == "random_forest":
+        params = {
+            'n_estimators': 100,
+            'max_depth': 10,
+            'min_samples_split': 5,
+            'random_state': 42,
+            # Arbres construits (et évalués) en parallèle sur tous les cœurs
+            'n_jobs': -1
+        }
+        if CuRandomForestClassifier is not None:
+            del params['n_jobs']
+            params['n_streams'] = 4
+            model = CuRandomForestClassifier(**params)
+            model_tag = "RandomForest-cuML"
+        else:
+            # Sans GPU, n_estimators devient un maximum : la forêt grandit par
+            # lots de 10 arbres tant que l'AUC out-of-bag progresse
+            # (fit_forest_oob)
+            params['n_estimators'] = 200
+            model = RandomForestClassifier(**params)
+            model_tag = "RandomForest"
+    else:
+        # Features discrétisées une fois en max_bins quantiles (codes uint8) :
+        # recherche des splits en O(bins) par nœud au lieu d'un tri
+        params = {
+            'max_bins': 255,
+            'max_iter': 200,
+            'max_depth': 10,
+            'learning_rate': 0.05,
+            'early_stopping': True,
+            'random_state': 42
+        }
+        model = HistGradientBoostingClassifier(**params)
+        model_tag = "HistGradientBoosting"
+    
+    # Entraînement, sauté si un modèle a déjà été entraîné sur exactement les
+    # mêmes données avec le même algorithme et les mêmes hyperparamètres
+    key = hashlib.blake2b(digest_size=8)
+    key.update(X_train)
+    key.update(y_train)
+    key.update(repr((model_tag, sorted(params.items()), sklearn.__version__)).encode())
+    cache_path = f"model/cache/{key.hexdigest()}.pkl"
     
-    # Entraînement
-    model = RandomForestClassifier(**params)
-    model.fit(X_train, y_train)
+    if os.path.exists(cache_path):
+        print(f"Modèle repris du cache : {cache_path}")
+        model = joblib.load(cache_path)
+        cache_status = "hit"
+    else:
+        if isinstance(model, RandomForestClassifier):
+            fit_forest_oob(model, X_train, y_train)
+        else:
+            model.fit(X_train, y_train)
+        if hasattr(model, "as_sklearn"):
+            model = model.as_sklearn()
+        joblib.dump(model, cache_path, compress=COMPRESSION, protocol=5)
+        cache_status = "miss"
+    if isinstance(model, RandomForestClassifier):
+        # Nombre d'arbres effectivement retenu, loggé avec les paramètres
+        params['n_estimators'] = model.n_estimators
+        # Aucune donnée out-of-bag dans le pickle servi (forêts mises en
+        # cache avant que fit_forest_oob ne calcule l'AUC lui-même comprises)
+        model.set_params(oob_score=False)
+        for attr in ("oob_score_", "oob_decision_function_"):
+            model.__dict__.pop(attr, None)
     
-    # Prédictions
-    y_pred = model.predict(X_test)
+    # Seul le jeu de test sert à l'évaluation et aux graphiques
+    del X_train, y_train
+    
+    # Prédictions : un seul parcours des arbres, les classes s'en déduisent
+    # au seuil 0.5 (même seuil que predict, et que l'API)
     y_proba = model.predict_proba(X_test)[:, 1]
     
-    # Calcul des métriques
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred)
-    recall = recall_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred)
-    auc = roc_auc_score(y_test, y_proba)
+    # Matrice de confusion et AUC en un seul passage sur (y_test, y_proba) ;
+    # les autres métriques s'en déduisent (0 quand le dénominateur est nul,
+    # comme sklearn)
+    tn, fp, fn, tp, auc = score_predictions(y_test, y_proba)
+    cm = np.array([[tn, fp], [fn, tp]])
+    accuracy = (tp + tn) / len(y_test)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * tp / (2 * tp + fp + fn) if tp else 0.0
     
-    # Log des paramètres et métriques dans MLflow
-    mlflow.log_params(params)
-    mlflow.log_metrics({
+    # Log des paramètres, métriques et tags dans MLflow en un seul appel
+    metrics = {
         "accuracy": accuracy,
         "precision": precision,
         "recall": recall,
         "f1_score": f1,
         "roc_auc": auc
-    })
-    
-    # Création et sauvegarde de la matrice de confusion
-    cm = confusion_matrix(y_test, y_pred)
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-    plt.title('Matrice de Confusion')
-    plt.ylabel('Vraie Classe')
-    plt.xlabel('Classe Prédite')
-    plt.savefig('confusion_matrix.png')
-    mlflow.log_artifact('confusion_matrix.png')
-    plt.close()
-    
-    # Feature importance
-    feature_importance = pd.DataFrame({
-        'feature': X.columns,
-        'importance': model.feature_importances_
-    }).sort_values('importance', ascending=False)
-    
-    plt.figure(figsize=(10, 6))
-    plt.barh(feature_importance['feature'], feature_importance['importance'])
-    plt.xlabel('Importance')
-    plt.title('Feature Importance')
-    plt.tight_layout()
-    plt.savefig('feature_importance.png')
-    mlflow.log_artifact('feature_importance.png')
-    plt.close()
-    
-    # Enregistrement du modèle dans MLflow
-    mlflow.sklearn.log_model(
-        model,
-        "model",
-        registered_model_name="bank-churn-classifier"
+    }
+    tags = {
+        "environment": "development",
+        "model_type": model_tag,
+        "model_cache": cache_status,
+        "task": "binary_classification"
+    }
+    timestamp = int(time.time() * 1000)
+    MlflowClient().log_batch(
+        mlflow.active_run().info.run_id,
+        metrics=[Metric(k, float(v), timestamp, 0) for k, v in metrics.items()],
+        params=[Param(k, str(v)) for k, v in params.items()],
+        tags=[RunTag(k, v) for k, v in tags.items()]
     )
     
-    # Sauvegarde locale du modèle
-    joblib.dump(model, "model/churn_model.pkl")
+    # Le modèle servi score surtout des lots de quelques lignes, pour lesquels
+    # répartir les arbres sur des threads coûte plus qu'il ne rapporte
+    if MODEL_TYPE == "random_forest":
+        model.set_params(n_jobs=None)
     
-    # Tags
-    mlflow.set_tags({
-        "environment": "development",
-        "model_type": "RandomForest",
-        "task": "binary_classification"
-    })
+    # Graphiques (MLFLOW_PLOTS=0 pour s'en passer, ex. en CI), tracés dans des
+    # threads pendant l'enregistrement du modèle. Les appels MLflow restent
+    # dans ce thread, qui porte le run actif
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        plots = []
+        if os.getenv("MLFLOW_PLOTS", "1") == "1":
+            plots.append(executor.submit(
+                save_confusion_matrix, cm, 'confusion_matrix.png'
+            ))
+            plots.append(executor.submit(
+                save_feature_importance,
+                model, X_test, y_test, feature_names, 'feature_importance.png'
+            ))
+        
+        # Enregistrement du modèle dans MLflow
+        mlflow.sklearn.log_model(
+            model,
+            "model",
+            registered_model_name="bank-churn-classifier",
+            serialization_format="cloudpickle"
+        )
+        
+        # Sauvegarde locale du modèle en pickle protocole 5 (buffers numpy hors
+        # bande) ; non compressée par défaut pour que l'API la charge en mmap
+        joblib.dump(
+            model,
+            "model/churn_model.pkl",
+            compress=COMPRESSION if MODEL_COMPRESS else 0,
+            protocol=5
+        )
+        
+        for plot in plots:
+            mlflow.log_artifact(plot.result())
     
     # Affichage des résultats
     print("\n" + "="*50)
@@ -0,0 +1,131 @@
+# train_utils.py
+from numbers import Integral
+
+import numpy as np
+from joblib import effective_n_jobs
+from scipy.stats import rankdata
+
+# Compilation JIT (numba) du calcul des métriques si disponible
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _score_numpy(y_true, y_proba):
+    """
+    Comptes (tn, fp, fn, tp) au seuil 0.5 et ROC AUC par la formule des
+    rangs (Mann-Whitney, rangs moyens pour les ex aequo).
+    """
+    y_pred = y_proba > 0.5
+    tn, fp, fn, tp = np.bincount(2 * y_true + y_pred, minlength=4).tolist()
+    n_pos = tp + fn
+    n_neg = tn + fp
+    if n_pos == 0 or n_neg == 0:
+        return tn, fp, fn, tp, np.nan
+    rank_sum = rankdata(y_proba)[y_true == 1].sum()
+    return tn, fp, fn, tp, (rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+def _score_loop(y_true, y_proba):
+    """
+    Même calcul que _score_numpy, en un seul parcours des probabilités
+    triées (compilé par numba).
+    """
+    n = y_true.shape[0]
+    order = np.argsort(y_proba, kind="mergesort")
+    tn = fp = fn = tp = 0
+    rank_sum = 0.0
+    i = 0
+    while i < n:
+        # Bloc d'ex aequo [i, j) : rang moyen (i + 1 + j) / 2
+        j = i + 1
+        while j < n and y_proba[order[j]] == y_proba[order[i]]:
+            j += 1
+        rank = (i + 1 + j) / 2
+        predicted = y_proba[order[i]] > 0.5
+        for k in range(i, j):
+            if y_true[order[k]] == 1:
+                rank_sum += rank
+                if predicted:
+                    tp += 1
+                else:
+                    fn += 1
+            elif predicted:
+                fp += 1
+            else:
+                tn += 1
+        i = j
+    n_pos = tp + fn
+    n_neg = tn + fp
+    if n_pos == 0 or n_neg == 0:
+        return tn, fp, fn, tp, np.nan
+    return tn, fp, fn, tp, (rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+if njit is not None:
+    score_predictions = njit(cache=True, nogil=True)(_score_loop)
+else:
+    score_predictions = _score_numpy
+
+
+def _accumulate_oob(trees, X, n_bootstrap, oob_sum, oob_count):
+    """
+    Ajoute à oob_sum / oob_count la probabilité de la classe 1 donnée par
+    chaque arbre aux lignes restées hors de son échantillon bootstrap.
+    """
+    n_samples = len(X)
+    for tree in trees:
+        # Même tirage que sklearn pour construire l'arbre (graine propre à
+        # chaque arbre, tirage uniforme avec remise sans sample_weight)
+        in_bag = np.random.RandomState(tree.random_state).randint(0, n_samples, n_bootstrap)
+        oob = np.bincount(in_bag, minlength=n_samples) == 0
+        oob_sum[oob] += tree.predict_proba(X[oob])[:, 1]
+        oob_count[oob] += 1
+
+
+def fit_forest_oob(model, X_train, y_train, step=10, tol=1e-4):
+    """
+    Fait croître la forêt par lots de step arbres (warm_start), jusqu'à
+    model.n_estimators au plus, et s'arrête dès que l'AUC out-of-bag ne
+    progresse plus de tol.
+
+    Les probabilités out-of-bag sont cumulées ici, en n'évaluant que les
+    arbres du dernier lot : oob_score=True réévaluerait toute la forêt à
+    chaque lot, et laisserait ses attributs oob_* dans le modèle sauvegardé.
+    """
+    if not model.bootstrap:
+        raise ValueError("L'AUC out-of-bag demande bootstrap=True")
+    max_estimators = model.n_estimators
+    n_samples = len(y_train)
+    if model.max_samples is None:
+        n_bootstrap = n_samples
+    elif isinstance(model.max_samples, Integral):
+        n_bootstrap = model.max_samples
+    else:
+        n_bootstrap = max(round(n_samples * model.max_samples), 1)
+    # Au moins un arbre par job dans chaque lot : tous les cœurs travaillent
+    step = max(step, effective_n_jobs(model.n_jobs))
+
+    model.set_params(warm_start=True, oob_score=False)
+    oob_sum = np.zeros(n_samples)
+    oob_count = np.zeros(n_samples, dtype=np.int64)
+    n_fitted = 0
+    previous_auc = -np.inf
+    # Dernier lot tronqué à max_estimators : la forêt est ajustée au moins
+    # une fois et peut atteindre le plafond même s'il n'est pas multiple de step
+    for n_estimators in range(step, max_estimators + step, step):
+        n_estimators = min(n_estimators, max_estimators)
+        model.set_params(n_estimators=n_estimators)
+        model.fit(X_train, y_train)
+        _accumulate_oob(model.estimators_[n_fitted:], X_train, n_bootstrap, oob_sum, oob_count)
+        n_fitted = n_estimators
+        # Avec peu d'arbres, quelques lignes n'ont jamais été hors du
+        # bootstrap : écartées du calcul
+        seen = oob_count > 0
+        *_, oob_auc = score_predictions(y_train[seen], oob_sum[seen] / oob_count[seen])
+        if oob_auc - previous_auc < tol:
+            break
+        previous_auc = oob_auc
+    model.set_params(warm_start=False)
+    return model